@@ -1,27 +1,65 @@
 import fitz  # PyMuPDF
 from typing import List, Dict, Optional, Tuple, Any
 import json
+import re
+
+try:
+    import orjson  # C-backed JSON encoder, much faster for large chunk texts
+except ImportError:
+    orjson = None
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import uuid
 import os
 
 
 class BookChunker:
-    def __init__(self, pdf_path: str, book_id: str, output_dir: Optional[str] = None):
+    def __init__(self, pdf_path: str, book_id: str, output_dir: Optional[str] = None,
+                 materialize_pdfs: bool = True):
         """
         Initialize the BookChunker with a PDF file.
-        
+
         Args:
             pdf_path: Path to the PDF file
             book_id: Book ID to use for mini PDFs (instead of generating one)
             output_dir: Directory to save mini PDFs (default: "pdfs" in current directory)
+            materialize_pdfs: When False, keep mini PDFs as in-memory bytes
+                on the chunk ('mini_pdf_bytes') instead of writing files
         """
         self.pdf_path = pdf_path
+        file_size = os.path.getsize(pdf_path)
         self.doc = fitz.open(pdf_path)
         self.toc = self.doc.get_toc()
+        # len() on a fitz.Document crosses into MuPDF every call, so
+        # materialize the page count once
+        self.page_count = len(self.doc)
         self.chunks: List[Dict] = []
+        # Per-page text cache: heading search, boundary extraction, and the
+        # third fix-up pass all revisit the same pages, and PyMuPDF text
+        # extraction is the dominant cost
+        self._page_text_cache: Dict[int, str] = {}
+        # Lowercased variants, filled on demand by find_heading_on_page
+        self._page_text_lower: Dict[int, str] = {}
+        # Hierarchical TOC paths, built lazily in one pass by _build_path
+        self._toc_paths: Optional[List[str]] = None
+        # Mini PDFs already built this run, keyed by (start_page, end_page)
+        self._mini_cache: Dict[Tuple[int, int], Any] = {}
+        # True once process_chunks has completed a full run
+        self._processed = False
+        # For typical books, extract every page's text up front: the
+        # boundary, extraction and fix-up passes touch nearly all pages
+        # anyway, so batching the MuPDF calls here beats faulting them in
+        # one by one. Huge files stay lazy to bound memory.
+        if file_size <= 50 * 1024 * 1024:
+            self._prefill_page_text()
         # Use provided book_id instead of generating one
         self.bookid = book_id
+        self.materialize_pdfs = materialize_pdfs
+        # One random namespace per chunker; chunk IDs are derived from it
+        # with uuid5 (pure hashing, no per-chunk urandom syscall)
+        self._id_namespace = uuid.uuid4()
+        self._id_counter = 0
         # Set output directory for mini PDFs
         if output_dir is None:
             # Default to "pdfs" directory in current working directory
@@ -46,11 +84,78 @@ class BookChunker:
             'index', 'glossary', 'notes', 'credits', 'about the author',
             'about the authors', 'colophon', 'epilogue', 'afterword'
         ]
-        
+
+        # Precompile keyword matching into a single alternation regex per list,
+        # so each title check is one C-level scan instead of a loop over ~15
+        # separate patterns
+        # The patterns are only ever matched against already-lowercased
+        # strings and the keywords are lowercase literals, so skip
+        # re.IGNORECASE and its per-character casefolding
+        self._front_matter_re = re.compile(
+            r'^(?:' + '|'.join(re.escape(k) for k in self.front_matter_keywords) + r')'
+        )
+        self._back_matter_re = re.compile(
+            r'^(?:' + '|'.join(re.escape(k) for k in self.back_matter_keywords) + r')'
+        )
+        # Path checks look for any keyword as a whitespace-bounded word; one
+        # alternation scan replaces ~90 Python-level substring checks per path
+        all_keywords = self.front_matter_keywords + self.back_matter_keywords
+        self._path_keyword_re = re.compile(
+            r'(?:^|\s)(?:' + '|'.join(re.escape(k) for k in all_keywords) + r')(?:\s|$)'
+        )
+        # Combined front+back anchored check used by _should_exclude_chunk,
+        # so the title decision is one regex engine entry instead of two
+        self._matter_re = re.compile(
+            r'^(?:' + '|'.join(re.escape(k) for k in all_keywords) + r')'
+        )
+
+    def _prefill_page_text(self):
+        """
+        Populate the page-text cache for the whole document.
+
+        get_text releases the GIL inside MuPDF, so extraction parallelizes
+        across threads. fitz documents are not thread-safe, so each worker
+        opens its own handle on the source file (same pattern as the
+        mini-PDF writer).
+        """
+        workers = min(4, os.cpu_count() or 1)
+        if workers < 2 or self.page_count < 16:
+            # Not enough work to amortize extra document handles
+            for i in range(self.page_count):
+                self._page_text_cache[i] = self.doc[i].get_text()
+            return
+
+        thread_local = threading.local()
+        worker_docs = []
+
+        def extract(page_num):
+            doc = getattr(thread_local, 'doc', None)
+            if doc is None:
+                doc = fitz.open(self.pdf_path)
+                thread_local.doc = doc
+                worker_docs.append(doc)
+            return doc[page_num].get_text()
+
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for i, text in enumerate(executor.map(extract, range(self.page_count))):
+                    self._page_text_cache[i] = text
+        finally:
+            for worker_doc in worker_docs:
+                worker_doc.close()
+
+    def _next_chunk_id(self) -> str:
+        """Generate the next chunk ID from the per-instance namespace."""
+        self._id_counter += 1
+        return str(uuid.uuid5(self._id_namespace, str(self._id_counter)))
+
     def get_page_text(self, page_num: int) -> str:
-        """Extract text from a specific page."""
-        page = self.doc[page_num]
-        return page.get_text()
+        """Extract text from a specific page (cached after first extraction)."""
+        text = self._page_text_cache.get(page_num)
+        if text is None:
+            text = self.doc[page_num].get_text()
+            self._page_text_cache[page_num] = text
+        return text
     
     def find_heading_on_page(self, heading_text: str, page_num: int) -> Optional[Tuple[int, int]]:
         """
@@ -63,12 +168,20 @@ class BookChunker:
         Returns:
             Tuple of (start_char, end_char) if found, None otherwise
         """
-        page = self.doc[page_num]
-        text = page.get_text()
-        
+        text = self.get_page_text(page_num)
+        # Scanned/image-only pages yield no text layer; skip the string
+        # matching entirely instead of searching an empty string twice
+        if not text.strip():
+            return None
+
         # Try to find the heading in the text (case-insensitive, flexible matching)
         heading_clean = heading_text.strip().lower()
-        text_lower = text.lower()
+        # Lowercasing copies the whole page; cache it so pages holding
+        # several TOC entries are casefolded once, not once per heading
+        text_lower = self._page_text_lower.get(page_num)
+        if text_lower is None:
+            text_lower = text.lower()
+            self._page_text_lower[page_num] = text_lower
         
         # Try exact match first
         idx = text_lower.find(heading_clean)
@@ -105,18 +218,16 @@ class BookChunker:
         Returns:
             Extracted text
         """
-        text_parts = []
-        
-        for page_num in range(start_page, end_page + 1):
-            page_text = self.get_page_text(page_num)
-            
-            if page_num == start_page and start_offset is not None:
-                page_text = page_text[start_offset:]
-            if page_num == end_page and end_offset is not None:
-                page_text = page_text[:end_offset]
-            
-            text_parts.append(page_text)
-        
+        # Gather cached page texts, then apply the character offsets only at
+        # the edges - interior pages never need slicing, so the per-page
+        # offset checks stay out of the loop
+        text_parts = [self.get_page_text(page_num) for page_num in range(start_page, end_page + 1)]
+
+        if start_offset is not None:
+            text_parts[0] = text_parts[0][start_offset:]
+        if end_offset is not None:
+            text_parts[-1] = text_parts[-1][:end_offset]
+
         return '\n'.join(text_parts)
     
     def process_chunks(self) -> List[Dict]:
@@ -135,18 +246,25 @@ class BookChunker:
             raise ValueError("No table of contents found in the PDF")
         
         chunks = []
-        num_pages = len(self.doc)
-        
+        num_pages = self.page_count
+        
+        # Locate every TOC heading exactly once up front. The boundary loop
+        # below needs each entry's position both as "current" and as "next",
+        # which used to mean two searches per entry.
+        toc_pages = [max(0, page - 1) for _, _, page in self.toc]
+        heading_positions = [
+            self.find_heading_on_page(title, toc_page)
+            for (_, title, _), toc_page in zip(self.toc, toc_pages)
+        ]
+
         # First pass: determine boundaries for each chunk
         chunk_boundaries = []
-        
+
         for i, toc_entry in enumerate(self.toc):
             level, title, page = toc_entry
-            toc_page = max(0, page - 1)
-            
-            # Find where this heading appears
-            heading_pos = self.find_heading_on_page(title, toc_page)
-            
+            toc_page = toc_pages[i]
+            heading_pos = heading_positions[i]
+
             # Determine where this chunk should start
             if i == 0:
                 # First chunk starts from beginning of document
@@ -154,9 +272,8 @@ class BookChunker:
                 chunk_start_offset = None
             else:
                 # Start from where previous heading ended
-                prev_toc_page = max(0, self.toc[i - 1][2] - 1)
-                prev_heading_pos = self.find_heading_on_page(self.toc[i - 1][1], prev_toc_page)
-                
+                prev_toc_page = toc_pages[i - 1]
+                prev_heading_pos = heading_positions[i - 1]
                 if prev_heading_pos:
                     # Previous heading was found - chunk starts after it
                     if toc_page == prev_toc_page:
@@ -179,10 +296,9 @@ class BookChunker:
             
             # Determine where this chunk should end
             if i < len(self.toc) - 1:
-                next_level, next_title, next_page = self.toc[i + 1]
-                next_toc_page = max(0, next_page - 1)
-                next_heading_pos = self.find_heading_on_page(next_title, next_toc_page)
-                
+                next_toc_page = toc_pages[i + 1]
+                next_heading_pos = heading_positions[i + 1]
+
                 if next_heading_pos:
                     # Next heading found - end before it
                     chunk_end_page = next_toc_page
@@ -204,7 +320,7 @@ class BookChunker:
                 'heading_page': toc_page,
                 'heading_pos': heading_pos
             })
-        
+
         # Second pass: extract text and handle text above headings
         for i, (toc_entry, boundary) in enumerate(zip(self.toc, chunk_boundaries)):
             level, title, page = toc_entry
@@ -231,23 +347,34 @@ class BookChunker:
                     # We'll handle this by adjusting previous chunk
                     pass
             
-            # Extract main text for this chunk
-            text = self.extract_text_between_pages(
-                boundary['start_page'],
-                boundary['end_page'],
-                boundary['start_offset'],
-                boundary['end_offset']
-            )
-            
             # Build path
             path = self._build_path(i)
-            
-            # Format text with heading first
-            formatted_text = f"{title}\n\n{text.strip()}" if text.strip() else title
-            
+
+            # Run the cheap title/path exclusion check before extracting any
+            # text: front/back matter gets filtered out below anyway, so
+            # don't pay page extraction for it
+            excluded = self._should_exclude_chunk({'title': title, 'path': path})
+
+            if excluded:
+                formatted_text = title
+            else:
+                # Extract main text for this chunk
+                text = self.extract_text_between_pages(
+                    boundary['start_page'],
+                    boundary['end_page'],
+                    boundary['start_offset'],
+                    boundary['end_offset']
+                )
+
+                # Format text with heading first (strip once - text can be
+                # megabytes and strip copies the whole string)
+                stripped_text = text.strip()
+                formatted_text = f"{title}\n\n{stripped_text}" if stripped_text else title
+
             chunk = {
+                "_excluded": excluded,
                 "bookid": self.bookid,
-                "chunkid": str(uuid.uuid4()),
+                "chunkid": self._next_chunk_id(),
                 "title": title,
                 "path": path,
                 "level": level,
@@ -261,57 +388,87 @@ class BookChunker:
             chunks.append(chunk)
         
         # Third pass: fix chunks where heading is in middle of page
-        # Text above heading should be added to previous chunk
+        # Text above heading should be added to previous chunk.
+        # Fragments are collected per chunk and joined once afterwards -
+        # '+=' on a megabyte chunk text copies the whole string per edit
+        fixup_parts: Dict[int, List[str]] = {}
         for i in range(1, len(chunks)):
             current_boundary = chunk_boundaries[i]
             prev_boundary = chunk_boundaries[i - 1]
             
             heading_pos = current_boundary['heading_pos']
             heading_page = current_boundary['heading_page']
-            
-            if heading_pos:
-                # Check if there's text above the heading that belongs to previous chunk
-                if prev_boundary['end_page'] == heading_page:
-                    # Previous chunk ended on same page
-                    if prev_boundary['end_offset'] is None:
-                        # Previous chunk ended at end of page, but heading is in middle
-                        # Text above heading should be in previous chunk
-                        page_text = self.get_page_text(heading_page)
-                        text_above = page_text[:heading_pos[0]].strip()
-                        if text_above:
-                            chunks[i - 1]['text'] += '\n' + text_above
-                            chunks[i - 1]['end_page'] = heading_page + 1
-                    elif prev_boundary['end_offset'] < heading_pos[0]:
-                        # There's a gap - text between belongs to previous chunk
-                        page_text = self.get_page_text(heading_page)
-                        text_between = page_text[prev_boundary['end_offset']:heading_pos[0]].strip()
-                        if text_between:
-                            chunks[i - 1]['text'] += '\n' + text_between
-                elif prev_boundary['end_page'] < heading_page:
-                    # Previous chunk ended on earlier page
-                    # Text from start of heading page to heading belongs to previous chunk
+
+            # A heading at the very top of its page has nothing above it by
+            # definition - skip the page-text slicing entirely (the common
+            # case: most TOC entries start at page top)
+            if heading_pos is None or heading_pos[0] == 0:
+                continue
+
+            # Check if there's text above the heading that belongs to previous chunk
+            if prev_boundary['end_page'] == heading_page:
+                # Previous chunk ended on same page
+                if prev_boundary['end_offset'] is None:
+                    # Previous chunk ended at end of page, but heading is in middle
+                    # Text above heading should be in previous chunk
                     page_text = self.get_page_text(heading_page)
                     text_above = page_text[:heading_pos[0]].strip()
                     if text_above:
-                        chunks[i - 1]['text'] += '\n' + text_above
+                        fixup_parts.setdefault(i - 1, []).append(text_above)
                         chunks[i - 1]['end_page'] = heading_page + 1
-        
-        # Filter out front and back matter
-        filtered_chunks = [chunk for chunk in chunks if not self._should_exclude_chunk(chunk)]
+                elif prev_boundary['end_offset'] < heading_pos[0]:
+                    # There's a gap - text between belongs to previous chunk
+                    page_text = self.get_page_text(heading_page)
+                    text_between = page_text[prev_boundary['end_offset']:heading_pos[0]].strip()
+                    if text_between:
+                        fixup_parts.setdefault(i - 1, []).append(text_between)
+            elif prev_boundary['end_page'] < heading_page:
+                # Previous chunk ended on earlier page
+                # Text from start of heading page to heading belongs to previous chunk
+                page_text = self.get_page_text(heading_page)
+                text_above = page_text[:heading_pos[0]].strip()
+                if text_above:
+                    fixup_parts.setdefault(i - 1, []).append(text_above)
+                    chunks[i - 1]['end_page'] = heading_page + 1
+
+        for idx, parts in fixup_parts.items():
+            chunks[idx]['text'] = '\n'.join([chunks[idx]['text'], *parts])
+
+        # Filter out front and back matter (decided above, before extraction)
+        filtered_chunks = [chunk for chunk in chunks if not chunk.pop('_excluded')]
         
         # Merge chunks based on page range logic
         merged_chunks = self._merge_chunks_by_page_range(filtered_chunks)
         
-        # Save mini PDFs for each chunk
-        for chunk in merged_chunks:
-            mini_pdf_path = self._save_mini_pdf(chunk)
-            chunk['mini_pdf_path'] = mini_pdf_path
+        # Save mini PDFs for each chunk in parallel: insert_pdf/save are
+        # mostly deflate + file I/O which release the GIL, but Document
+        # objects are not thread-safe, so each worker opens its own
+        # read-only handle on the source PDF
+        thread_local = threading.local()
+        worker_docs = []
+
+        def save_one(chunk):
+            source_doc = getattr(thread_local, 'doc', None)
+            if source_doc is None:
+                source_doc = fitz.open(self.pdf_path)
+                thread_local.doc = source_doc
+                worker_docs.append(source_doc)
+            return self._save_mini_pdf(chunk, source_doc)
+
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                for chunk, mini_pdf_path in zip(merged_chunks, executor.map(save_one, merged_chunks)):
+                    chunk['mini_pdf_path'] = mini_pdf_path
+        finally:
+            for worker_doc in worker_docs:
+                worker_doc.close()
         
         self.chunks = merged_chunks
-        
+        self._processed = True
+
         # Calculate and print analytics
         self._print_page_range_analytics(merged_chunks)
-        
+
         return merged_chunks
     
     def _build_path(self, toc_index: int) -> str:
@@ -324,25 +481,19 @@ class BookChunker:
         Returns:
             Path string like "Chapter 1 > Section 1.1 > Subsection 1.1.1"
         """
-        current_entry = self.toc[toc_index]
-        current_level = current_entry[0]
-        path_parts = [current_entry[1]]
-        
-        # Walk backwards to find parent headings
-        for i in range(toc_index - 1, -1, -1):
-            entry = self.toc[i]
-            entry_level = entry[0]
-            
-            # If we find a heading at a lower level, it's a parent
-            if entry_level < current_level:
-                path_parts.insert(0, entry[1])
-                current_level = entry_level
-                
-                # Stop if we've reached the root level
-                if entry_level == 1:
-                    break
-        
-        return " > ".join(path_parts)
+        if self._toc_paths is None:
+            # Build every path in one forward pass with an ancestor stack
+            # instead of walking the TOC backwards per entry (O(N) total
+            # rather than O(N^2) over the TOC)
+            paths = []
+            stack = []  # (level, title) of currently open ancestors
+            for level, title, _page in self.toc:
+                while stack and stack[-1][0] >= level:
+                    stack.pop()
+                paths.append(" > ".join([t for _, t in stack] + [title]))
+                stack.append((level, title))
+            self._toc_paths = paths
+        return self._toc_paths[toc_index]
     
     def _merge_chunks_by_page_range(self, chunks: List[Dict]) -> List[Dict]:
         """
@@ -413,26 +564,33 @@ class BookChunker:
         # Use the first chunk as base
         combined = chunks[0].copy()
         main_path = chunks[0]['path']
-        
-        # Collect paths from other chunks (excluding the main path)
+
+        # Accumulate text, related paths, level, and page bounds in a single
+        # pass instead of re-scanning the chunk list once per field
         related_paths = []
+        combined_texts = [chunks[0]['text']]
+        min_level = chunks[0]['level']
+        min_start_page = chunks[0]['start_page']
+        max_end_page = chunks[0]['end_page']
+
         for chunk in chunks[1:]:  # Skip first chunk (main path)
             if chunk['path'] != main_path and chunk['path'] not in related_paths:
                 related_paths.append(chunk['path'])
-        
-        # Combine text: each chunk already has heading first, so just join them
-        combined_texts = [chunk['text'] for chunk in chunks]
-        combined_text = '\n\n'.join(combined_texts)
-        
+            # Each chunk already has heading first, so just join the texts
+            combined_texts.append(chunk['text'])
+            min_level = min(min_level, chunk['level'])
+            min_start_page = min(min_start_page, chunk['start_page'])
+            max_end_page = max(max_end_page, chunk['end_page'])
+
         # Update metadata
         combined['title'] = chunks[0]['title']  # Keep first title as main
         combined['path'] = main_path  # Keep first path as main
         combined['related_paths'] = related_paths  # Only other paths, excluding main
-        combined['level'] = min(chunk['level'] for chunk in chunks)  # Minimum level
-        combined['start_page'] = min(chunk['start_page'] for chunk in chunks)
-        combined['end_page'] = max(chunk['end_page'] for chunk in chunks)
-        combined['text'] = combined_text
-        combined['chunkid'] = str(uuid.uuid4())  # New chunk ID for merged chunk
+        combined['level'] = min_level
+        combined['start_page'] = min_start_page
+        combined['end_page'] = max_end_page
+        combined['text'] = '\n\n'.join(combined_texts)
+        combined['chunkid'] = self._next_chunk_id()  # New chunk ID for merged chunk
         combined['mini_pdf_path'] = None  # Will be set when saving mini PDF after merging
         
         return combined
@@ -448,18 +606,9 @@ class BookChunker:
             True if it's front matter, False otherwise
         """
         title_lower = title.lower().strip()
-        
-        # Check exact matches
-        for keyword in self.front_matter_keywords:
-            if keyword == title_lower:
-                return True
-        
-        # Check if title starts with front matter keyword
-        for keyword in self.front_matter_keywords:
-            if title_lower.startswith(keyword):
-                return True
-        
-        return False
+
+        # Exact and prefix matches in one scan (exact is covered by the anchor)
+        return bool(self._front_matter_re.match(title_lower))
     
     def _is_back_matter(self, title: str) -> bool:
         """
@@ -472,54 +621,72 @@ class BookChunker:
             True if it's back matter, False otherwise
         """
         title_lower = title.lower().strip()
-        
-        # Check exact matches
-        for keyword in self.back_matter_keywords:
-            if keyword == title_lower:
-                return True
-        
-        # Check if title starts with back matter keyword
-        for keyword in self.back_matter_keywords:
-            if title_lower.startswith(keyword):
-                return True
-        
-        # Check if it's a subsection of back matter (e.g., "Index > A")
-        # by checking if path contains back matter keywords
-        return False
+
+        # Exact and prefix matches in one scan (exact is covered by the anchor)
+        # Subsections of back matter (e.g., "Index > A") are caught by the
+        # path check in _should_exclude_chunk
+        return bool(self._back_matter_re.match(title_lower))
     
-    def _save_mini_pdf(self, chunk: Dict) -> str:
+    def _save_mini_pdf(self, chunk: Dict, source_doc=None) -> Optional[str]:
         """
         Save a mini PDF containing only the pages for this chunk.
-        
+
         Args:
             chunk: The chunk dictionary with start_page and end_page
-            
+            source_doc: Optional document handle to copy pages from
+                (used by worker threads; defaults to self.doc)
+
         Returns:
-            Path to the saved mini PDF file
+            Path to the saved mini PDF file, or None when the chunker was
+            created with materialize_pdfs=False (bytes are stored on the
+            chunk instead)
         """
+        doc = source_doc if source_doc is not None else self.doc
         start_page = chunk['start_page']  # 1-indexed
         end_page = chunk['end_page']  # 1-indexed, inclusive
-        
-        # Convert to 0-indexed for PyMuPDF (which uses 0-indexed)
-        start_page_0 = start_page - 1
-        end_page_0 = end_page - 1
-        
+
+        # Chunks that survived merging can still share a page range; build
+        # and write each distinct range only once
+        cache_key = (start_page, end_page)
+        cached = self._mini_cache.get(cache_key)
+        if cached is not None:
+            if not self.materialize_pdfs:
+                chunk['mini_pdf_bytes'] = cached
+                return None
+            return cached
+
+        # Convert to 0-indexed for PyMuPDF (which uses 0-indexed) and clamp
+        # to the document bounds
+        start_page_0 = max(0, start_page - 1)
+        end_page_0 = min(self.page_count - 1, end_page - 1)
+
         # Create a new PDF document
         mini_doc = fitz.open()
-        
-        # Copy pages from the original document
-        for page_num in range(start_page_0, end_page_0 + 1):
-            if 0 <= page_num < len(self.doc):
-                mini_doc.insert_pdf(self.doc, from_page=page_num, to_page=page_num)
-        
+
+        # Copy the whole page range in a single call instead of per-page
+        # inserts, which re-resolve shared resources for every page
+        if start_page_0 <= end_page_0:
+            mini_doc.insert_pdf(doc, from_page=start_page_0, to_page=end_page_0)
+
+        # Consumers that upload or process the bytes directly skip the disk
+        # round-trip entirely
+        if not self.materialize_pdfs:
+            pdf_bytes = mini_doc.tobytes(garbage=0, deflate=True)
+            mini_doc.close()
+            chunk['mini_pdf_bytes'] = pdf_bytes
+            self._mini_cache[cache_key] = pdf_bytes
+            return None
+
         # Generate filename: bookid_startpage_endpage.pdf
         filename = f"{self.bookid}_{start_page}_{end_page}.pdf"
         filepath = os.path.join(self.output_dir, filename)
-        
-        # Save the mini PDF
-        mini_doc.save(filepath)
+
+        # Save the mini PDF (freshly built, so skip the garbage-collection
+        # object walk and just compress)
+        mini_doc.save(filepath, garbage=0, deflate=True)
         mini_doc.close()
-        
+
+        self._mini_cache[cache_key] = filepath
         return filepath
     
     def _should_exclude_chunk(self, chunk: Dict) -> bool:
@@ -534,49 +701,69 @@ class BookChunker:
         """
         title = chunk.get('title', '')
         path = chunk.get('path', '')
-        
-        # Check if title is front matter
-        if self._is_front_matter(title):
-            return True
-        
-        # Check if title is back matter
-        if self._is_back_matter(title):
+
+        # Lowercase the title once and check front and back matter in a
+        # single combined scan
+        title_lower = title.lower().strip()
+        if self._matter_re.match(title_lower):
             return True
-        
-        # Check if path contains front matter (for subsections like "Preface > Section 1")
-        path_lower = path.lower()
-        for keyword in self.front_matter_keywords:
-            # Check if keyword appears as a separate word in the path
-            # This avoids false positives (e.g., "Introduction" in "Introduction to Networks")
-            if f' {keyword} ' in path_lower or path_lower.startswith(keyword + ' ') or path_lower.endswith(' ' + keyword):
-                return True
-        
-        # Check if path contains back matter (for subsections like "Index > A")
-        for keyword in self.back_matter_keywords:
-            # Check if keyword appears as a separate word in the path
-            if f' {keyword} ' in path_lower or path_lower.startswith(keyword + ' ') or path_lower.endswith(' ' + keyword):
-                return True
-        
-        return False
+
+        # Check if path contains a front/back matter keyword as a separate
+        # word (for subsections like "Preface > Section 1" or "Index > A").
+        # Word-bounding avoids false positives (e.g., "Introduction" in
+        # "Introduction to Networks")
+        return bool(self._path_keyword_re.search(path.lower()))
     
-    def save_chunks(self, output_path: str, format: str = "json"):
+    def save_chunks(self, output_path: str, format: str = "json",
+                    chunks: Optional[List[Dict]] = None):
         """
         Save chunks to a file.
-        
+
         Args:
             output_path: Path to save the chunks
             format: Output format ("json" or "jsonl")
+            chunks: Optional pre-processed chunk list; defaults to this
+                chunker's own chunks
         """
-        if not self.chunks:
-            self.process_chunks()
-        
+        if chunks is None:
+            # Run the pipeline only if it has never completed - an empty
+            # result is not a reason to redo extraction and mini-PDF writes
+            # (e.g. when saving to both formats back to back)
+            if not self._processed:
+                self.process_chunks()
+            chunks = self.chunks
+
         if format == "json":
-            with open(output_path, 'w', encoding='utf-8') as f:
-                json.dump(self.chunks, f, indent=2, ensure_ascii=False)
+            # Serialize chunk-by-chunk so peak memory stays one chunk's
+            # encoding, not the whole list's
+            if orjson is not None:
+                # orjson writes bytes directly and skips the pure-Python
+                # escape loop - the chunk texts dominate the output size
+                with open(output_path, 'wb') as f:
+                    f.write(b'[\n')
+                    for i, chunk in enumerate(chunks):
+                        if i:
+                            f.write(b',\n')
+                        f.write(orjson.dumps(chunk, option=orjson.OPT_INDENT_2))
+                    f.write(b'\n]')
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    f.write('[\n')
+                    for i, chunk in enumerate(chunks):
+                        if i:
+                            f.write(',\n')
+                        f.write(json.dumps(chunk, indent=2, ensure_ascii=False))
+                    f.write('\n]')
         elif format == "jsonl":
-            with open(output_path, 'w', encoding='utf-8') as f:
-                for chunk in self.chunks:
-                    f.write(json.dumps(chunk, ensure_ascii=False) + '\n')
+            if orjson is not None:
+                with open(output_path, 'wb') as f:
+                    for chunk in chunks:
+                        f.write(orjson.dumps(chunk))
+                        f.write(b'\n')
+            else:
+                with open(output_path, 'w', encoding='utf-8') as f:
+                    for chunk in chunks:
+                        f.write(json.dumps(chunk, ensure_ascii=False) + '\n')
         else:
             raise ValueError(f"Unsupported format: {format}")
     
@@ -595,31 +782,39 @@ class BookChunker:
             print("No chunks to analyze")
             return {}
         
-        # Calculate page ranges
-        page_ranges = []
+        # Track extremes and the zero-range count in a single pass instead
+        # of materializing a per-chunk dict list and re-scanning it with
+        # max()/min()
         zero_page_ranges = 0
-        
+        longest = None
+        shortest = None
+
         for chunk in chunks:
             start = chunk['start_page']
             end = chunk['end_page']
             range_size = end - start + 1  # +1 because both start and end are inclusive
-            
-            page_ranges.append({
-                'chunk_id': chunk.get('chunkid', 'unknown'),
-                'title': chunk.get('title', 'unknown'),
-                'start_page': start,
-                'end_page': end,
-                'range_size': range_size
-            })
-            
+
+            if longest is None or range_size > longest['range_size']:
+                longest = {
+                    'chunk_id': chunk.get('chunkid', 'unknown'),
+                    'title': chunk.get('title', 'unknown'),
+                    'start_page': start,
+                    'end_page': end,
+                    'range_size': range_size
+                }
+            if shortest is None or range_size < shortest['range_size']:
+                shortest = {
+                    'chunk_id': chunk.get('chunkid', 'unknown'),
+                    'title': chunk.get('title', 'unknown'),
+                    'start_page': start,
+                    'end_page': end,
+                    'range_size': range_size
+                }
+
             if start == end:
                 zero_page_ranges += 1
-        
-        # Find longest and shortest ranges
-        if page_ranges:
-            longest = max(page_ranges, key=lambda x: x['range_size'])
-            shortest = min(page_ranges, key=lambda x: x['range_size'])
-            
+
+        if longest is not None:
             analytics = {
                 'total_chunks': len(chunks),
                 'longest_page_range': {
@@ -658,6 +853,9 @@ class BookChunker:
             return {}
     
     def close(self):
-        """Close the PDF document."""
+        """Close the PDF document and release the cached page text."""
+        self._page_text_cache.clear()
+        self._page_text_lower.clear()
+        self._mini_cache.clear()
         self.doc.close()
 
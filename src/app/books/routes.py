@@ -1,20 +1,41 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, status, Form
-from celery_app.tasks import process_pdf_task, delete_book_task
+from celery_app.tasks import process_pdf_task, delete_book_task, send_book_uploaded_email_task
 from database.auth import get_current_user, get_admin_user, users_collection
 from services.email_service import email_service
+import asyncio
+import hashlib
+import json
 import os
-import uuid
-import shutil
+import secrets
+import redis.asyncio as aioredis
+from celery import group
 from celery_app.celery_app import celery_app
 from celery.result import AsyncResult
 from database.mongo import books_collection
+from pymongo import UpdateOne
 router = APIRouter(prefix="/pdf", tags=["PDF Upload & Delete"])
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+# Async Redis client for the task-status cache, created on first use
+_status_redis = None
+
+
+def _get_status_redis():
+    """Get or create the async Redis client used to cache task statuses."""
+    global _status_redis
+    if _status_redis is None:
+        try:
+            _status_redis = aioredis.from_url(REDIS_URL, decode_responses=True)
+        except Exception as e:
+            print(f"⚠️ Task status cache unavailable: {e}")
+    return _status_redis
+
 # -------------------- Upload Route -------------------- #
-@router.post("/upload")
+@router.post("/upload", status_code=status.HTTP_202_ACCEPTED)
 async def upload_pdf(
     file: UploadFile = File(...),
     book_name: str = Form(None),
@@ -29,30 +50,54 @@ async def upload_pdf(
         book_name: Optional book name. Required if PDF metadata doesn't contain a title.
     """
     try:
-        # Save file temporarily
-        file_id = str(uuid.uuid4())
+        # Save file temporarily, reading in 1 MiB chunks through the async
+        # interface so the event loop keeps serving other requests while
+        # the upload streams to disk
+        # token_hex is a single urandom+hex call - same 32 hex chars as a
+        # formatted uuid4 without the UUID parse/format machinery
+        file_id = secrets.token_hex(16)
         file_path = os.path.join(UPLOAD_DIR, f"{file_id}_{file.filename}")
         with open(file_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
+            while chunk := await file.read(1 << 20):
+                await asyncio.to_thread(f.write, chunk)
 
         user_id = str(current_user["id"])
-        qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
+
+        # Content-hash the upload (file_digest uses OpenSSL's accelerated
+        # SHA path) in a worker thread so the disk read + hash of a
+        # book-sized PDF doesn't stall the event loop. If this user
+        # already uploaded a byte-identical PDF we can skip the whole
+        # processing pipeline.
+        with open(file_path, "rb") as f:
+            digest = (await asyncio.to_thread(hashlib.file_digest, f, "sha256")).hexdigest()
+
+        existing = await books_collection.find_one(
+            {"sha256": digest}, {"id": 1, "uploaded_by": 1, "title": 1, "_id": 0}
+        )
+        if existing:
+            uploaded_by = existing.get("uploaded_by", {})
+            already_uploaded = (
+                user_id in uploaded_by
+                if isinstance(uploaded_by, (dict, list))
+                else False
+            )
+            if already_uploaded:
+                os.remove(file_path)
+                return {
+                    "message": "✅ File already uploaded. No processing needed.",
+                    "task_id": None,
+                    "filename": file.filename,
+                    "uploaded_by": user_id,
+                    "book_id": existing.get("id"),
+                }
+
         # Enqueue Celery background task with user_id and optional book_name
-        task = process_pdf_task.delay(pdf_path=file_path, user_id=user_id)
+        task = process_pdf_task.delay(pdf_path=file_path, user_id=user_id, sha256=digest)
 
-        # Send book upload email notification
-        try:
-            user = await users_collection.find_one({"id": user_id})
-            if user:
-                book_display_name = book_name or file.filename or "Untitled"
-                email_service.send_book_uploaded_email(
-                    user_email=user.get("email"),
-                    user_name=user.get("name", user.get("username", "User")),
-                    book_name=book_display_name,
-                    book_id="processing"  # Book ID not available yet
-                )
-        except Exception as e:
-            print(f"⚠️ Failed to send book upload email: {e}")
+        # Send the upload email from a worker so the response doesn't wait
+        # on the user lookup + SMTP round trip
+        book_display_name = book_name or file.filename or "Untitled"
+        send_book_uploaded_email_task.delay(user_id, book_display_name)
 
         return {
             "message": "✅ File uploaded successfully. Processing started.",
@@ -85,15 +130,21 @@ async def delete_all_user_books(user_id: str, current_user: dict = Depends(get_c
             ]
         }
         
-        # Get all books for this user
-        cursor = books_collection.find(query)
-        user_books = await cursor.to_list(length=10000)  # Large limit to get all
-        
         deleted_count = 0
         task_ids = []
-        
-        # Delete each book
-        for book in user_books:
+        bulk_ops = []
+        delete_sigs = []
+        # Flush accumulated work every this many books so processing
+        # overlaps with the Mongo fetch instead of waiting for all
+        # documents to materialise first
+        FLUSH_EVERY = 500
+
+        # Stream the books for this user instead of loading them all into
+        # memory at once (only the fields the loop reads - skips shipping
+        # and decoding fat TOC/metadata subdocuments)
+        async for book in books_collection.find(
+            query, {"id": 1, "uploaded_by": 1, "title": 1, "_id": 0}
+        ):
             book_id = book.get("id")
             if not book_id:
                 continue
@@ -108,32 +159,51 @@ async def delete_all_user_books(user_id: str, current_user: dict = Depends(get_c
             if isinstance(uploaded_by, dict):
                 if len(uploaded_by) == 1 and user_id in uploaded_by:
                     # User is the only uploader - delete completely
-                    task = delete_book_task.delay(book_id=book_id, user_id=user_id)
-                    task_ids.append(task.id)
+                    delete_sigs.append(delete_book_task.s(book_id=book_id, user_id=user_id))
                     deleted_count += 1
                 elif user_id in uploaded_by:
                     # Multiple users - just remove this user
                     uploaded_by.pop(user_id, None)
-                    await books_collection.update_one(
+                    bulk_ops.append(UpdateOne(
                         {"id": book_id},
                         {"$set": {"uploaded_by": uploaded_by}}
-                    )
+                    ))
                     deleted_count += 1
             else:
                 # Old list format - if only one user, delete completely
                 if len(uploaded_by) == 1 and user_id in uploaded_by:
-                    task = delete_book_task.delay(book_id=book_id, user_id=user_id)
-                    task_ids.append(task.id)
+                    delete_sigs.append(delete_book_task.s(book_id=book_id, user_id=user_id))
                     deleted_count += 1
                 elif user_id in uploaded_by:
                     # Remove user from list
                     uploaded_by.remove(user_id)
-                    await books_collection.update_one(
+                    bulk_ops.append(UpdateOne(
                         {"id": book_id},
                         {"$set": {"uploaded_by": uploaded_by}}
-                    )
+                    ))
                     deleted_count += 1
-        
+
+            # Periodic flush keeps memory bounded and gets work started
+            # while the cursor is still streaming
+            if len(bulk_ops) >= FLUSH_EVERY:
+                await books_collection.bulk_write(bulk_ops, ordered=False)
+                bulk_ops = []
+            if len(delete_sigs) >= FLUSH_EVERY:
+                group_result = group(delete_sigs).apply_async()
+                task_ids.extend(child.id for child in group_result.children)
+                delete_sigs = []
+
+        # One round trip for all the remaining unshare updates instead of
+        # one per book
+        if bulk_ops:
+            await books_collection.bulk_write(bulk_ops, ordered=False)
+
+        # Publish all remaining full deletions to the broker as a single
+        # group rather than one .delay() round trip per book
+        if delete_sigs:
+            group_result = group(delete_sigs).apply_async()
+            task_ids.extend(child.id for child in group_result.children)
+
         return {
             "message": f"Deleted {deleted_count} books for user",
             "deleted_count": deleted_count,
@@ -155,10 +225,12 @@ async def delete_pdf(book_id: str, current_user: dict = Depends(get_current_user
     try:
         user_id = str(current_user["id"])
         is_admin = str(current_user.get("role")) == "admin"
-        qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
 
-        # Get book info before deletion for email
-        book = await books_collection.find_one({"id": book_id})
+        # Get book info before deletion for email (only the fields this
+        # handler reads)
+        book = await books_collection.find_one(
+            {"id": book_id}, {"id": 1, "uploaded_by": 1, "title": 1, "_id": 0}
+        )
         if not book:
             raise HTTPException(status_code=404, detail="Book not found")
 
@@ -179,15 +251,24 @@ async def delete_pdf(book_id: str, current_user: dict = Depends(get_current_user
             # Enqueue Celery deletion task (admin deletion always deletes completely)
             task = delete_book_task.delay(book_id=book_id, user_id=None)  # None means admin deletion
             
-            # Send book deletion email notification to ALL users who uploaded this book
+            # Send book deletion email notification to ALL users who uploaded
+            # this book. Fetch every recipient in one query instead of a
+            # find_one round trip per user.
             emails_sent = 0
+            users_by_id = {}
+            if user_ids:
+                async for user in users_collection.find(
+                    {"id": {"$in": user_ids}},
+                    {"id": 1, "email": 1, "name": 1, "username": 1, "_id": 0}
+                ):
+                    users_by_id[user["id"]] = user
             for uid in user_ids:
                 try:
-                    user = await users_collection.find_one({"id": uid})
+                    user = users_by_id.get(uid)
                     if user and user.get("email"):
                         # Get user's custom book name if available
                         user_book_name = uploaded_by.get(uid, book_title) if isinstance(uploaded_by, dict) else book_title
-                        
+
                         email_service.send_book_deleted_by_admin_email(
                             user_email=user.get("email"),
                             user_name=user.get("name", user.get("username", "User")),
@@ -253,9 +334,23 @@ async def delete_pdf(book_id: str, current_user: dict = Depends(get_current_user
 async def get_task_status(task_id: str):
     """
     Check the current status or result of a Celery task.
+
+    Responses are cached briefly in Redis (500 ms while running, 60 s once
+    finished) so clients polling every second don't hammer the Celery
+    result backend.
     """
+    cache_key = f"task_status:{task_id}"
+    redis_client = _get_status_redis()
+    if redis_client:
+        try:
+            cached = await redis_client.get(cache_key)
+            if cached:
+                return json.loads(cached)
+        except Exception as e:
+            print(f"⚠️ Task status cache read failed: {e}")
+
     task_result = AsyncResult(task_id, app=celery_app)
-    
+
     response = {
         "task_id": task_id,
         "status": task_result.status,       # e.g. PENDING, STARTED, SUCCESS, FAILURE
@@ -272,5 +367,14 @@ async def get_task_status(task_id: str):
         }
     else:
         response["result"] = None
-    
+
+    if redis_client:
+        try:
+            # Terminal states are stable; in-flight states only need to
+            # absorb the polling interval
+            ttl_ms = 60000 if task_result.ready() else 500
+            await redis_client.set(cache_key, json.dumps(response, default=str), px=ttl_ms)
+        except Exception as e:
+            print(f"⚠️ Task status cache write failed: {e}")
+
     return response
\ No newline at end of file
@@ -1,15 +1,74 @@
+import asyncio
+import torch
 from sentence_transformers import SentenceTransformer
 
 class Embedder:
     def __init__(self, model_name: str = "all-mpnet-base-v2", device: str = "cpu"):
         self.model = SentenceTransformer(model_name, device=device)
+        # Micro-batching state for embed_async, created lazily so importing
+        # this module outside an event loop (e.g. Celery workers) stays free
+        self._queue = None
+        self._batcher_task = None
+        if device == "cpu":
+            # Dynamic int8 quantization of the Linear layers roughly doubles
+            # CPU matmul throughput and halves the bytes moved, at a
+            # negligible accuracy cost for retrieval embeddings
+            try:
+                self.model = torch.ao.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                print("✅ Embedder: int8 dynamic quantization enabled")
+            except Exception as e:
+                print(f"⚠️ Embedder: quantization unavailable, using fp32: {e}")
 
     def embed(self, texts):
         if isinstance(texts, str):
             texts = [texts]
         return self.model.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
 
-    def embed_batch(self, texts, batch_size: int = 64, show_progress_bar: bool = True):
+    async def embed_async(self, text: str):
+        """
+        Embed a single query, coalescing concurrent callers into one
+        model.encode batch.
+
+        Single-query encodes under-fill the CPU's SIMD lanes; requests
+        arriving within a ~10 ms window are batched together, so per-query
+        cost drops as concurrency rises. The encode itself runs in a worker
+        thread, keeping the event loop free.
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._batcher_task = loop.create_task(self._batch_loop())
+        future = loop.create_future()
+        await self._queue.put((text, future))
+        return await future
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            # Short window for concurrent requests to join this batch
+            deadline = loop.time() + 0.01
+            while len(items) < 32:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            try:
+                vectors = await asyncio.to_thread(self.embed, [text for text, _ in items])
+                for (_, future), vector in zip(items, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                for _, future in items:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def embed_batch(self, texts, batch_size: int = 64, show_progress_bar: bool = False):
         if isinstance(texts, str):
             texts = [texts]
         return self.model.encode(
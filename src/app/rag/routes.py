@@ -1,10 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends
 from celery_app.tasks import search_similar_in_books_task, process_contexts_and_generate_task
 from app.helpers import AIMODEL, B2_UPLOADER
+import asyncio
 import os
 from pydantic import BaseModel
 from database.mongo import books_collection, chat_sessions_collection
 from database.auth import get_current_user
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
 from app.embedder import embedder
@@ -27,6 +29,24 @@ async def book_exists(book_id: str) -> bool:
 
 FILE_SERVER_URL = os.getenv("FILE_SERVER_URL", "http://localhost:8000")
 
+# Small in-process LRU of prompt -> embedding vector. RAG sessions
+# re-ask similar prompts often and each encode is tens of ms of CPU.
+_EMBED_CACHE: OrderedDict = OrderedDict()
+_EMBED_CACHE_MAX = 2048
+
+
+async def _embed_prompt(prompt: str) -> list:
+    """Embed a prompt, serving repeated prompts from the LRU cache."""
+    cached = _EMBED_CACHE.get(prompt)
+    if cached is not None:
+        _EMBED_CACHE.move_to_end(prompt)
+        return cached
+    vector = (await embedder.embed_async(prompt)).tolist()
+    _EMBED_CACHE[prompt] = vector
+    if len(_EMBED_CACHE) > _EMBED_CACHE_MAX:
+        _EMBED_CACHE.popitem(last=False)
+    return vector
+
 @router.post("/query")
 async def rag_multiple_books_answer(
     request: QueryMultipleBooksRequest,
@@ -66,15 +86,20 @@ async def rag_multiple_books_answer(
             raise HTTPException(status_code=403, detail="Access denied to this chat session")
 
     top_k = 20  # Get 20 results from Qdrant for LLM to select from
-    # Embed the user prompt (convert to list for JSON serialization)
-    query_vec = embedder.embed(request.prompt)[0].tolist()
+    # Embed the user prompt (convert to list for JSON serialization).
+    # Repeated prompts hit the LRU cache; misses go through embed_async,
+    # which batches concurrent requests into one encode call and keeps
+    # the event loop free while the model runs.
+    query_vec = await _embed_prompt(request.prompt)
     
     # ----------------------------
     # Step 1: Search for similar chunks in specified books using hybrid search
     # ----------------------------
     try:
         search_task = search_similar_in_books_task.delay(query_vec, request.prompt, request.book_id, top_k)
-        contexts = search_task.get(timeout=60)  # list of dicts (20 results)
+        # Join the Celery result in a worker thread so a slow search
+        # doesn't pin the event loop for up to 60 s
+        contexts = await asyncio.to_thread(search_task.get, timeout=60)  # list of dicts (20 results)
     except TimeoutError:
         raise HTTPException(status_code=504, detail="Search task timed out.")
     except Exception as e:
@@ -88,7 +113,7 @@ async def rag_multiple_books_answer(
     # ----------------------------
     try:
         llm_task = process_contexts_and_generate_task.delay(contexts, request.prompt)
-        task_result = llm_task.get(timeout=60)
+        task_result = await asyncio.to_thread(llm_task.get, timeout=60)
     except TimeoutError:
         raise HTTPException(status_code=504, detail="LLM generation task timed out.")
     except Exception as e:
@@ -104,24 +129,35 @@ async def rag_multiple_books_answer(
     # ----------------------------
     downloaded_files = []
     # clear_downloads_folder()
+    # Several selected contexts often point at the same mini-PDF; dedupe
+    # by source_pdf and fetch the unique ones concurrently in worker
+    # threads instead of one serial B2 round trip per context
+    unique_pdfs = {}
     for c in selected_contexts:
         source_pdf = c.get("source_pdf")
-        if source_pdf:
-            try:
-                local_pdf = B2_UPLOADER.download_file(source_pdf)
-                local_pdf_path = Path(local_pdf)
-
-                # Create relative URL path
-                relative_path = f"downloads/{local_pdf_path.name}"
-                url = f"{FILE_SERVER_URL}/{quote(relative_path.replace(os.sep, '/'))}"
-                downloaded_files.append({
-                    "type": "pdf",
-                    "path": str(local_pdf),
-                    "url": url,
-                    "name": c["path"]
-                })
-            except Exception as e:
-                print(f"Error downloading PDF {source_pdf}: {e}")
+        if source_pdf and source_pdf not in unique_pdfs:
+            unique_pdfs[source_pdf] = c
+
+    if unique_pdfs:
+        results = await asyncio.gather(
+            *(asyncio.to_thread(B2_UPLOADER.download_file, name) for name in unique_pdfs),
+            return_exceptions=True,
+        )
+        for (source_pdf, c), result in zip(unique_pdfs.items(), results):
+            if isinstance(result, Exception):
+                print(f"Error downloading PDF {source_pdf}: {result}")
+                continue
+            local_pdf_path = Path(result)
+
+            # Create relative URL path
+            relative_path = f"downloads/{local_pdf_path.name}"
+            url = f"{FILE_SERVER_URL}/{quote(relative_path.replace(os.sep, '/'))}"
+            downloaded_files.append({
+                "type": "pdf",
+                "path": str(result),
+                "url": url,
+                "name": c["path"]
+            })
 
     # Combine selected context text for debugging / display
     context_text = "\n\n".join([
@@ -1,7 +1,6 @@
 import os
 import uuid
 import fitz
-import concurrent.futures
 from typing import List, Dict, Optional
 from qdrant_client import models
 from celery_app.celery_app import celery_app
@@ -38,6 +37,22 @@ def initialize_qdrant_collection_task(collection_name: str = "pdf_chunks"):
     else:
         print("ℹ️ Using existing Qdrant collection.")
     
+    # Migrate the 'content' index on pre-existing collections: it used to
+    # be KEYWORD, and create_payload_index below won't replace an existing
+    # index's schema, so the full-text prefilter would silently not apply
+    if not collection_created:
+        try:
+            info = QDRANT_CLIENT.get_collection(collection_name)
+            content_index = (info.payload_schema or {}).get("content")
+            if content_index is not None and content_index.data_type != models.PayloadSchemaType.TEXT:
+                QDRANT_CLIENT.delete_payload_index(
+                    collection_name=collection_name,
+                    field_name="content"
+                )
+                print("🔄 Dropped legacy keyword index on 'content'; recreating as full-text")
+        except Exception as e:
+            print(f"⚠️ Warning: Could not migrate 'content' index: {e}")
+
     # Ensure required indexes exist with explicit schema types
     # Qdrant requires explicit field_schema when collection is empty or can't auto-detect
     required_indexes = [
@@ -49,7 +64,13 @@ def initialize_qdrant_collection_task(collection_name: str = "pdf_chunks"):
         {"field_name": "heading", "field_schema": models.PayloadSchemaType.KEYWORD},
         {"field_name": "path", "field_schema": models.PayloadSchemaType.KEYWORD},
         {"field_name": "source_pdf", "field_schema": models.PayloadSchemaType.KEYWORD},
-        {"field_name": "content", "field_schema": models.PayloadSchemaType.KEYWORD},
+        # Full-text index so keyword search can prefilter server-side
+        # (MatchText) instead of scrolling every chunk back to the client
+        {"field_name": "content", "field_schema": models.TextIndexParams(
+            type="text",
+            tokenizer=models.TokenizerType.WORD,
+            lowercase=True
+        )},
         {"field_name": "related_paths", "field_schema": models.PayloadSchemaType.KEYWORD},  # Array of strings
         # Integer fields (INTEGER)
         {"field_name": "start_page", "field_schema": models.PayloadSchemaType.INTEGER},
@@ -136,10 +157,10 @@ def create_toc_fingerprint(toc_tree: Dict) -> str:
 
 
 @celery_app.task(name="check_or_create_book_task", queue='uploads')
-def check_or_create_book_task(title: str, author_name: str, pages: int, user_id: str, user_book_name: str = None, toc_tree: Dict = None, pdf_filename: str = None) -> Dict:
+def check_or_create_book_task(title: str, author_name: str, pages: int, user_id: str, user_book_name: str = None, toc_tree: Dict = None, pdf_filename: str = None, sha256: str = None) -> Dict:
     """
     Check if book exists or create new book entry.
-    
+
     Args:
         title: Title from PDF metadata (can be empty string)
         author_name: Author from PDF metadata
@@ -148,6 +169,7 @@ def check_or_create_book_task(title: str, author_name: str, pages: int, user_id:
         user_book_name: User-provided book name (stored in uploaded_by dict)
         toc_tree: Table of contents tree
         pdf_filename: Original PDF filename (used as fallback when title is missing)
+        sha256: Content hash of the uploaded PDF (used to dedupe re-uploads)
     """
     # Extract filename without extension if pdf_filename is provided
     fallback_title = None
@@ -230,7 +252,11 @@ def check_or_create_book_task(title: str, author_name: str, pages: int, user_id:
             toc_fingerprint = create_toc_fingerprint(toc_tree)
             if toc_fingerprint:
                 update_fields["toc_fingerprint"] = toc_fingerprint
-        
+
+        # Backfill the content hash so later re-uploads dedupe cheaply
+        if sha256 and "sha256" not in existing_book:
+            update_fields["sha256"] = sha256
+
         if update_fields:
             books_collection.update_one(
                 {"id": book_id},
@@ -293,7 +319,11 @@ def check_or_create_book_task(title: str, author_name: str, pages: int, user_id:
             "uploaded_at": datetime.utcnow(),
             "uploaded_by": uploaded_by,  # Dict: {user_id: book_name}
         }
-        
+
+        # Store the content hash so identical re-uploads short-circuit
+        if sha256:
+            new_book["sha256"] = sha256
+
         # Add TOC tree and fingerprint if provided
         if toc_tree:
             new_book["toc"] = toc_tree
@@ -361,14 +391,12 @@ def upload_chunks_to_b2_task(pdf_chunks: List[Dict], book_id: str, title: str, a
     if not B2_UPLOADER:
         raise EnvironmentError("B2 Uploader not initialized.")
     
-    def upload_one(i):
-        chunk = pdf_chunks[i]
-        file_info = {"book_id": book_id, "book_name": title, "author_name": author_name}
-        return i, B2_UPLOADER.upload_one(chunk["local_path"], chunk["filename"], file_info)
+    file_info = {"book_id": book_id, "book_name": title, "author_name": author_name}
+    all_urls = B2_UPLOADER.upload_many(
+        [(chunk["local_path"], chunk["filename"], file_info) for chunk in pdf_chunks],
+        workers=workers,
+    )
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
-        all_urls = [url for _, url in executor.map(upload_one, range(len(pdf_chunks)))]
-    
     print(f"✅ Uploaded {len([u for u in all_urls if u])} chunks to B2")
     return all_urls
 
@@ -446,6 +474,23 @@ def update_book_status_task(book_id: str, status: str):
     return {"book_id": book_id, "status": status}
 
 
+@celery_app.task(name="send_book_uploaded_email_task", queue='default')
+def send_book_uploaded_email_task(user_id: str, book_display_name: str):
+    """Send the 'book uploaded' notification email outside the request path."""
+    try:
+        user = users_collection.find_one({"id": user_id})
+        if user:
+            email_service.send_book_uploaded_email(
+                user_email=user.get("email"),
+                user_name=user.get("name", user.get("username", "User")),
+                book_name=book_display_name,
+                book_id="processing"  # Book ID not available yet
+            )
+            print(f"📧 Sent book upload email to {user.get('email')}")
+    except Exception as e:
+        print(f"⚠️ Failed to send book upload email: {e}")
+
+
 # ------------------ Main PDF Processing Pipeline (LOW PRIORITY) ------------------ #
 
 @celery_app.task(name="process_pdf_pipeline_task", queue='uploads')
@@ -545,7 +590,7 @@ def process_pdf_pipeline_task(
 
 
 @celery_app.task(name="process_pdf_to_qdrant_task", queue='uploads')
-def process_pdf_task(pdf_path: str, user_id: str, batch_size: int = 50, workers: int = 6):
+def process_pdf_task(pdf_path: str, user_id: str, batch_size: int = 50, workers: int = 6, sha256: str = None):
     """
     Main entry point for PDF upload. Quickly validates and creates book entry,
     then delegates heavy processing to background pipeline.
@@ -610,7 +655,8 @@ def process_pdf_task(pdf_path: str, user_id: str, batch_size: int = 50, workers:
         user_id,
         user_book_name,  # User-provided name (stored in uploaded_by)
         toc_tree,
-        pdf_filename  # Original PDF filename for fallback
+        pdf_filename,  # Original PDF filename for fallback
+        sha256  # Content hash for re-upload dedupe
     )
     
     # If book already exists, return immediately
@@ -13,10 +13,30 @@ from database.api.admin import router as admin_router
 from app.books.routes import router as app_book_router
 from app.rag.routes import router as rag_router
 from fastapi.staticfiles import StaticFiles
+from database.mongo import books_collection
 
 app = FastAPI(title="AI Project API", version="1.0")
 
 
+@app.on_event("startup")
+async def ensure_mongo_indexes():
+    """
+    Ensure indexes backing the hot book queries exist.
+
+    delete_all_user_books filters on the dynamic uploaded_by.<user_id>
+    key path and delete_pdf hits {"id": book_id}; without these indexes
+    both queries collection-scan as the books collection grows.
+    """
+    try:
+        await books_collection.create_index("id", unique=True)
+        await books_collection.create_index([("uploaded_by.$**", 1)])
+        # Sparse: only books with a content hash carry the field
+        await books_collection.create_index("sha256", sparse=True)
+        print("✅ MongoDB book indexes ensured")
+    except Exception as e:
+        print(f"⚠️ Failed to create MongoDB indexes: {e}")
+
+
 BASE_DIR = Path(__file__).resolve().parent
 DOWNLOADS_DIR = BASE_DIR / "downloads"
 app.mount("/downloads", StaticFiles(directory=DOWNLOADS_DIR), name="downloads")